@@ -1,38 +1,72 @@
 """
 To run this script, you need to install the following libraries:
 `$ pip install genson pyyaml`
+
+Optionally, install `orjson` for much faster parsing of large inputs.
 """
 import json
 import yaml
 from argparse import ArgumentParser
+from pathlib import Path
 
 from genson import SchemaBuilder
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # libyaml-backed dumper, typically 5-10x faster than the pure-Python one
+    from yaml import CSafeDumper
+except ImportError:
+    from yaml import SafeDumper as CSafeDumper
+
 
 def add_example(schema, example):
     """
-    Recursively adds example values to the schema.
+    Adds example values to the schema.
+
+    Walks schema and example together with an explicit stack instead of
+    recursion, fetching each node's keys once; on deeply nested schemas this
+    avoids per-node call frames and repeated dict lookups.
     """
-    if schema.get("type") == "array" and "items" in schema:
-        if isinstance(example, list) and example:
-            add_example(schema["items"], example[0])
-    if schema.get("type") == "object" and "properties" in schema:
-        for key, subschema in schema["properties"].items():
-            if example.get(key):
-                value = example[key]
-                if not isinstance(value, (dict, list)):
+    _isinstance = isinstance
+    stack = [(schema, example)]
+    while stack:
+        schema, example = stack.pop()
+        type_ = schema.get("type")
+        if type_ == "object":
+            properties = schema.get("properties")
+            if not properties or not _isinstance(example, dict):
+                continue
+            for key, subschema in properties.items():
+                value = example.get(key)
+                if not value:
+                    continue
+                if _isinstance(value, dict):
+                    stack.append((subschema, value))
+                elif _isinstance(value, list):
+                    items = subschema.get("items")
+                    if items and _isinstance(value[0], dict):
+                        stack.append((items, value[0]))
+                else:
                     subschema["example"] = value
-                if isinstance(value, dict):
-                    add_example(subschema, value)
-                elif isinstance(value, list) and value and isinstance(value[0], dict):
-                    add_example(subschema["items"], value[0])
+        elif type_ == "array":
+            items = schema.get("items")
+            if items and _isinstance(example, list) and example:
+                stack.append((items, example[0]))
 
 
 def gen_schema(data):
     builder = SchemaBuilder()
     builder.add_object(data)
     schema = builder.to_schema()
-    add_example(schema, data)
+    if schema.get("type") in ("object", "array"):
+        add_example(schema, data)
+    elif not isinstance(data, (dict, list)):
+        # Scalar input: no tree to walk, just record the value itself.
+        schema["example"] = data
     return schema
 
 
@@ -42,12 +76,13 @@ def json_schema_to_yaml(json_schema=None, json_path=None, yaml_path=None):
             raise ValueError("json_schema or json_path must be specified.")
         with open(json_path, "r", encoding="utf-8") as f:
             json_schema = json.load(f)
-    yaml_str = yaml.dump(json_schema, sort_keys=False)
     if yaml_path:
+        # Dump straight to the file so the full serialized form is never
+        # held in memory.
         with open(yaml_path, "w", encoding="utf-8") as f:
-            f.write(yaml_str)
+            yaml.dump(json_schema, f, sort_keys=False, Dumper=CSafeDumper)
     else:
-        print(yaml_str)
+        print(yaml.dump(json_schema, sort_keys=False, Dumper=CSafeDumper))
 
 
 if __name__ == "__main__":
@@ -63,8 +98,11 @@ if __name__ == "__main__":
     output_json = args.output_json
     output_yaml = args.output_yaml
 
-    with open(input_fp) as f:
-        data = json.load(f)
+    if orjson is not None:
+        data = orjson.loads(Path(input_fp).read_bytes())
+    else:
+        with open(input_fp) as f:
+            data = json.load(f)
     schema = gen_schema(data)
 
     if output_yaml or (not output_yaml and not output_json):
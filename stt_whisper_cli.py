@@ -1,13 +1,12 @@
 # /// script
 # requires-python = ">=3.12"
-# dependencies = ["sounddevice", "soundfile", "numpy"]
+# dependencies = ["sounddevice", "numpy", "scipy", "openai-whisper", "pyobjc-framework-Cocoa"]
 # ///
 """
 Real-time Speech Transcription using OpenAI Whisper
 
 Requires:
 - macOS (uses pbcopy for clipboard)
-- Whisper CLI installed (e.g. `brew install openai-whisper`)
 
 Usage:
     uv run stt_whisper_cli.py                      # Basic usage with default settings
@@ -18,33 +17,66 @@ Usage:
 """
 
 import argparse
+import bisect
+import queue
 import subprocess
 import sys
-import tempfile
 import threading
 from datetime import datetime
 from pathlib import Path
-from time import sleep, time
+from time import monotonic, time
 from typing import Any
 
 import numpy as np
 import sounddevice as sd
-import soundfile as sf
+import whisper
+from scipy.signal import resample_poly
+
+try:
+    # In-process pasteboard access (pyobjc); avoids a pbcopy fork per update.
+    from AppKit import NSPasteboard, NSPasteboardTypeString
+except ImportError:
+    NSPasteboard = None
+
+# Whisper always works at 16 kHz; recording at (or resampling to) it lets the
+# captured array go straight into the model with no resample stage.
+TARGET_SAMPLERATE = 16000
+
+# Initial recording buffer capacity; the buffer doubles if a take runs longer.
+MAX_SECONDS = 60
+
+# Silence inserted between takes when batching utterances (seconds).
+BATCH_GAP_SECONDS = 0.5
 
 
 class Recorder:
     def __init__(self):
-        self.samplerate = int(sd.query_devices(kind="input")["default_samplerate"])
+        self.samplerate = TARGET_SAMPLERATE
+        try:
+            sd.check_input_settings(
+                samplerate=TARGET_SAMPLERATE, channels=1, dtype="float32"
+            )
+            self._capture_rate = TARGET_SAMPLERATE
+        except sd.PortAudioError:
+            # Device can't capture at 16 kHz; record at its native rate and
+            # resample in the drain thread.
+            self._capture_rate = int(
+                sd.query_devices(kind="input")["default_samplerate"]
+            )
         self.recording = False
-        self.audio_data: list[np.ndarray] = []
+        self.frames = 0
         self._start_time: float = 0
 
     def start(self) -> None:
-        self.audio_data = []
+        self.frames = 0
+        self._buf = np.empty((self._capture_rate * MAX_SECONDS, 1), dtype=np.float32)
+        self._q: queue.SimpleQueue = queue.SimpleQueue()
         self.recording = True
-        self._start_time = time()
+        self._start_time = monotonic()
+        self._drain_thread = threading.Thread(target=self._drain, daemon=True)
+        self._drain_thread.start()
         self.stream = sd.InputStream(
-            samplerate=self.samplerate,
+            samplerate=self._capture_rate,
             channels=1,
             dtype="float32",
             callback=self._callback,
@@ -54,57 +86,191 @@ class Recorder:
     def _callback(
         self, indata: np.ndarray, frames: int, time: Any, status: Any
     ) -> None:
+        # Runs on PortAudio's realtime thread: indata is a view into
+        # PortAudio's internal buffer and is reused after the callback
+        # returns, so it must be copied before it crosses the queue. The
+        # copy is small and bounded; everything else happens on the drain
+        # thread.
         if self.recording:
-            self.audio_data.append(indata.copy())
+            self._q.put_nowait(indata.copy())
+
+    def _drain(self) -> None:
+        """Copy queued callback blocks into the recording buffer (None = stop)."""
+        while True:
+            chunk = self._q.get()
+            if chunk is None:
+                return
+            end = self.frames + len(chunk)
+            if end > len(self._buf):
+                self._buf = np.resize(self._buf, (len(self._buf) * 2, 1))
+            self._buf[self.frames : end] = chunk
+            self.frames = end
 
     def elapsed(self) -> float:
         """Return elapsed recording time in seconds."""
         if self._start_time:
-            return time() - self._start_time
+            return monotonic() - self._start_time
         return 0.0
 
     def stop(self) -> np.ndarray:
         self.recording = False
         self.stream.stop()
         self.stream.close()
-        if self.audio_data:
-            return np.concatenate(self.audio_data, axis=0)
-        return np.array([])
-
-
-def transcribe(audio_path: Path, model: str = "base", lang: str = "en") -> str:
-    result = subprocess.run(
-        [
-            "whisper",
-            str(audio_path),
-            "--model",
-            model,
-            "--language",
-            lang,
-            "--output_format",
-            "txt",
-            "--output_dir",
-            str(audio_path.parent),
-        ],
-        capture_output=True,
-        text=True,
-    )
-    if result.returncode != 0:
-        print(f"Whisper error: {result.stderr}", file=sys.stderr)
+        self._q.put_nowait(None)
+        self._drain_thread.join()
+        audio = self._buf[: self.frames, 0]
+        if self._capture_rate != self.samplerate:
+            # Resample the whole take in one pass: resampling per chunk
+            # would reset the polyphase filter state at every block edge,
+            # injecting discontinuities at each boundary.
+            audio = resample_poly(
+                audio, self.samplerate, self._capture_rate
+            ).astype(np.float32)
+            self.frames = len(audio)
+        return audio
+
+
+def warmup(model: whisper.Whisper, lang: str) -> None:
+    """Transcribe 1 s of silence to trigger lazy CUDA/Metal kernel compilation.
+
+    Runs at the top of the transcription worker, while the user reads the
+    first prompt, so the first real utterance doesn't pay the cold-start
+    cost. Whisper's decoding is not thread-safe on a shared model, so the
+    warm-up must never overlap a real transcription.
+    """
+    try:
+        model.transcribe(np.zeros(16000, dtype=np.float32), language=lang)
+    except Exception:
+        pass  # Warm-up is best-effort; real errors surface in transcribe().
+
+
+def transcribe(model: whisper.Whisper, audio: np.ndarray, lang: str = "en") -> str:
+    try:
+        result = model.transcribe(audio, language=lang)
+    except Exception as e:
+        print(f"Whisper error: {e}", file=sys.stderr)
         return ""
+    return result["text"].strip()
+
+
+def transcribe_batch(
+    model: whisper.Whisper, audios: list[np.ndarray], lang: str = "en"
+) -> list[str]:
+    """Transcribe several takes in a single Whisper pass.
+
+    Concatenates the takes with short silence gaps, transcribes once with
+    word timestamps, and splits the segments back onto the takes by their
+    start times. Amortizes Whisper's fixed per-call cost over all takes.
+    """
+    if len(audios) == 1:
+        return [transcribe(model, audios[0], lang=lang)]
+    gap = np.zeros(int(BATCH_GAP_SECONDS * TARGET_SAMPLERATE), dtype=np.float32)
+    pieces = []
+    offsets = []  # start time of each take within the batch, in seconds
+    t = 0.0
+    for audio in audios:
+        offsets.append(t)
+        pieces.append(audio)
+        pieces.append(gap)
+        t += len(audio) / TARGET_SAMPLERATE + BATCH_GAP_SECONDS
+    try:
+        # condition_on_previous_text=False keeps the decoder from bleeding
+        # context across the silence gaps between takes.
+        result = model.transcribe(
+            np.concatenate(pieces),
+            language=lang,
+            word_timestamps=True,
+            condition_on_previous_text=False,
+        )
+    except Exception as e:
+        print(f"Whisper error: {e}", file=sys.stderr)
+        return [""] * len(audios)
+    texts: list[list[str]] = [[] for _ in audios]
+    for segment in result["segments"]:
+        # Assign word by word: a segment can straddle a gap, so its own
+        # start time alone would misattribute the tail words to the
+        # previous take. The epsilon keeps a word starting exactly on a
+        # boundary in the take that begins there.
+        words = segment.get("words") or []
+        if not words:
+            i = bisect.bisect_right(offsets, segment["start"] + 1e-3) - 1
+            texts[i].append(segment["text"].strip())
+            continue
+        for word in words:
+            i = bisect.bisect_right(offsets, word["start"] + 1e-3) - 1
+            texts[i].append(word["word"].strip())
+    return [" ".join(parts) for parts in texts]
+
+
+def transcription_worker(
+    model: whisper.Whisper,
+    jobs: queue.Queue,
+    args: argparse.Namespace,
+    print_lock: threading.Lock,
+) -> None:
+    """Transcribe queued recordings and publish the results (None = stop).
+
+    Runs in a background thread so the user can start the next recording
+    while Whisper is still working on the previous one. If several takes
+    have queued up, they are transcribed together in one batched pass.
+    """
+    warmup(model, args.lang)
+
+    # Running clipboard content for append mode; appending one piece per
+    # utterance avoids re-joining the whole session (O(N^2)) each round.
+    clipboard_text = ""
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        batch = [job]
+        done = False
+        while True:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                done = True
+                break
+            batch.append(job)
+
+        texts = transcribe_batch(
+            model, [audio for audio, _ in batch], lang=args.lang
+        )
+        for (_, t_start), text in zip(batch, texts):
+            if not text:
+                with print_lock:
+                    print("Transcription failed or no content!")
+                continue
 
-    # Read the generated .txt file
-    txt_path = audio_path.with_suffix(".txt")
-    if txt_path.exists():
-        text = txt_path.read_text().strip()
-        txt_path.unlink()
-        return text
-    return ""
+            elapsed = time() - t_start
+            if args.append:
+                clipboard_text += ("\n" if clipboard_text else "") + text
+            else:
+                clipboard_text = text
+            copy_to_clipboard(clipboard_text)
+
+            if args.output:
+                save_transcription(text, args.output)
+
+            mode_info = " (appended)" if args.append else ""
+            with print_lock:
+                print(f"Completed in {elapsed:.1f}s (copied to clipboard{mode_info})")
+                print(f"  > {text}")
+
+        if done:
+            return
 
 
 def copy_to_clipboard(text: str) -> None:
     """Copy text to clipboard (macOS)."""
-    subprocess.run(["pbcopy"], input=text.encode(), check=True)
+    if NSPasteboard is not None:
+        pb = NSPasteboard.generalPasteboard()
+        pb.clearContents()
+        pb.setString_forType_(text, NSPasteboardTypeString)
+    else:
+        subprocess.run(["pbcopy"], input=text.encode(), check=True)
 
 
 def save_transcription(text: str, output_fp: Path) -> None:
@@ -119,14 +285,17 @@ def save_transcription(text: str, output_fp: Path) -> None:
 
 def display_timer(recorder: Recorder, stop_event: threading.Event) -> None:
     """Display recording duration in real-time."""
-    while not stop_event.is_set():
+    while True:
         elapsed = recorder.elapsed()
         mins, secs = divmod(int(elapsed), 60)
         # \r moves cursor to start of line, end="" prevents newline
         print(
             f"\r[REC] {mins:02d}:{secs:02d} (Press Enter to stop)", end="", flush=True
         )
-        sleep(0.1)
+        # wait() returns True as soon as the event is set, so stopping isn't
+        # delayed by a full sleep; 0.25 s updates keep wakeups low.
+        if stop_event.wait(0.25):
+            break
     print()  # Newline after timer stops
 
 
@@ -157,6 +326,11 @@ def main() -> None:
     args = parser.parse_args()
 
     recorder = Recorder()
+    # Load the model once up front; per-utterance transcription then skips
+    # the subprocess fork, torch import, and weight I/O entirely.
+    print(f"Loading Whisper model '{args.model}'...")
+    model = whisper.load_model(args.model)
+
     print("Real-time Speech Transcription")
     print(f"  Model: {args.model}")
     print(f"  Language: {args.lang}")
@@ -169,8 +343,16 @@ def main() -> None:
     print("Press Ctrl+C to exit")
     print()
 
-    # Store all transcriptions in this session for append mode
-    session_transcripts: list[str] = []
+    # Transcription runs in a worker thread so the next recording can start
+    # while Whisper is still processing the previous one.
+    jobs: queue.Queue = queue.Queue()
+    print_lock = threading.Lock()
+    worker = threading.Thread(
+        target=transcription_worker,
+        args=(model, jobs, args, print_lock),
+        daemon=True,
+    )
+    worker.start()
 
     try:
         while True:
@@ -189,47 +371,22 @@ def main() -> None:
             timer_thread.join()
             audio = recorder.stop()
 
-            if len(audio) == 0:
+            if recorder.frames == 0:
                 print("No audio detected!")
                 continue
 
-            duration = len(audio) / recorder.samplerate
-            print(f"Duration: {duration:.1f}s")
-
-            # Save temporary file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-                temp_path = Path(f.name)
-                sf.write(temp_path, audio, recorder.samplerate)
-
-            start = time()
-            print("Transcribing...")
-            text = transcribe(temp_path, model=args.model, lang=args.lang)
-            temp_path.unlink()
-
-            if text:
-                elapsed = time() - start
-
-                # Handle clipboard
-                if args.append:
-                    session_transcripts.append(text)
-                    clipboard_text = "\n".join(session_transcripts)
-                else:
-                    clipboard_text = text
-                copy_to_clipboard(clipboard_text)
-
-                # Save transcription to output file if specified
-                if args.output:
-                    save_transcription(text, args.output)
-
-                mode_info = " (appended)" if args.append else ""
-                print(f"Completed in {elapsed:.1f}s (copied to clipboard{mode_info})")
-                print(f"  > {text}")
-            else:
-                print("Transcription failed or no content!")
+            duration = recorder.frames / recorder.samplerate
+            with print_lock:
+                print(f"Duration: {duration:.1f}s")
+                print("Transcribing...")
+                print()
 
-            print()
+            jobs.put((audio, time()))
 
     except KeyboardInterrupt:
+        # Let any queued transcriptions finish before exiting.
+        jobs.put(None)
+        worker.join()
         print("\nGoodbye!")
 
 